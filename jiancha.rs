@@ -5,6 +5,7 @@ use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
 use std::path::{Path, PathBuf};
 use std::process::Command;
+use std::sync::atomic::{AtomicUsize, Ordering};
 use std::thread;
 use std::time::{SystemTime, UNIX_EPOCH};
 
@@ -27,6 +28,8 @@ enum FetchStatus {
 struct Cache {
     last_run_at: Option<u64>,
     repos: HashMap<String, CacheEntry>,
+    #[serde(default)]
+    commits: HashMap<String, CommitEntry>,
 }
 
 #[derive(Debug, Clone, Serialize, Deserialize)]
@@ -38,10 +41,17 @@ struct CacheEntry {
     fetch_status: FetchStatus,
 }
 
+#[derive(Debug, Clone, Serialize, Deserialize)]
+struct CommitEntry {
+    head: String,
+    last_commit: String,
+}
+
 #[derive(Debug)]
 struct Args {
     fresh: bool,
     offline: bool,
+    no_color: bool,
 }
 
 const REMOTE_TTL_SECS: u64 = 30 * 60;
@@ -52,6 +62,7 @@ const SESSION_GAP_REFRESH_SECS: u64 = 90 * 60;
 struct RepoRow {
     repo_key: String,
     directory: String,
+    head: Option<String>,
     branch: Option<String>,
     last_commit: Option<String>,
     clean: Option<bool>,
@@ -61,30 +72,35 @@ struct RepoRow {
     fetch_status: FetchStatus,
 }
 
-fn is_git_repo(dir: &Path) -> bool {
-    Command::new("git")
-        .args(["-C", dir.to_str().unwrap_or(""), "rev-parse", "--git-dir"])
-        .stdout(std::process::Stdio::null())
-        .stderr(std::process::Stdio::null())
-        .status()
-        .map(|s| s.success())
-        .unwrap_or(false)
-}
-
-fn git_cmd(dir: &str, args: &[&str]) -> Option<String> {
-    let mut full_args = vec!["-C", dir];
-    full_args.extend_from_slice(args);
+fn git_cmd(dir: &Path, args: &[&str]) -> Option<String> {
     Command::new("git")
-        .args(&full_args)
+        .arg("--no-optional-locks")
+        .arg("-C")
+        .arg(dir)
+        .args(args)
         .stderr(std::process::Stdio::null())
         .output()
         .ok()
         .filter(|o| o.status.success())
-        .and_then(|o| String::from_utf8(o.stdout).ok())
-        .map(|s| s.trim().to_string())
+        .map(|o| {
+            let mut out = o.stdout;
+            let end = out
+                .iter()
+                .rposition(|b| !b.is_ascii_whitespace())
+                .map_or(0, |i| i + 1);
+            out.truncate(end);
+            let start = out
+                .iter()
+                .position(|b| !b.is_ascii_whitespace())
+                .unwrap_or(0);
+            out.drain(..start);
+            String::from_utf8(out)
+                .unwrap_or_else(|e| String::from_utf8_lossy(e.as_bytes()).into_owned())
+        })
 }
 
 struct LocalInfo {
+    head: String,
     branch: String,
     last_commit: String,
     clean: bool,
@@ -92,30 +108,62 @@ struct LocalInfo {
     upstream: Option<String>,
 }
 
-fn get_local_info(dir: &str) -> Option<LocalInfo> {
-    let branch = git_cmd(dir, &["rev-parse", "--abbrev-ref", "HEAD"])?;
-    let last_commit = git_cmd(dir, &["log", "-1", "--pretty=%s"])?;
-    let status_out = git_cmd(dir, &["status", "--porcelain"])?;
-    let clean = status_out.is_empty();
-    let has_unpushed = git_cmd(dir, &["rev-list", "--count", "@{u}..HEAD"])
-        .and_then(|s| s.parse::<u32>().ok())
-        .map(|n| n > 0);
-    let upstream = git_cmd(
-        dir,
-        &["rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}"],
-    );
-    Some(LocalInfo {
-        branch,
+fn get_local_info(dir: &Path, cached: Option<&CommitEntry>) -> Result<LocalInfo, &'static str> {
+    let failed = "Failed to get git info";
+    let status_out = git_cmd(dir, &["status", "--porcelain=v2", "--branch"]).ok_or(failed)?;
+    let mut head = None;
+    let mut branch = None;
+    let mut upstream = None;
+    let mut upstream_live = false;
+    let mut has_unpushed = None;
+    let mut clean = true;
+    for line in status_out.lines() {
+        if let Some(header) = line.strip_prefix("# ") {
+            if let Some(oid) = header.strip_prefix("branch.oid ") {
+                head = Some(oid.to_string());
+            } else if let Some(name) = header.strip_prefix("branch.head ") {
+                branch = Some(match name {
+                    "(detached)" => "HEAD".to_string(),
+                    name => name.to_string(),
+                });
+            } else if let Some(name) = header.strip_prefix("branch.upstream ") {
+                upstream = Some(name.to_string());
+            } else if let Some(ab) = header.strip_prefix("branch.ab ") {
+                upstream_live = true;
+                has_unpushed = ab
+                    .split_whitespace()
+                    .next()
+                    .and_then(|ahead| ahead.trim_start_matches('+').parse::<u32>().ok())
+                    .map(|n| n > 0);
+            }
+        } else if !line.is_empty() {
+            clean = false;
+        }
+    }
+    let head = head.ok_or(failed)?;
+    let last_commit = match cached.filter(|entry| entry.head == head) {
+        Some(entry) => entry.last_commit.clone(),
+        None => git_cmd(
+            dir,
+            &["log", "-1", "--no-show-signature", "--pretty=format:%s"],
+        )
+        .ok_or(failed)?,
+    };
+    Ok(LocalInfo {
+        head,
+        branch: branch.ok_or(failed)?,
         last_commit,
         clean,
         has_unpushed,
-        upstream,
+        upstream: upstream.filter(|_| upstream_live),
     })
 }
 
-fn run_git_fetch(dir: &str) -> FetchStatus {
+fn run_git_fetch(dir: &Path) -> FetchStatus {
     let ok = Command::new("git")
-        .args(["-C", dir, "fetch", "--quiet"])
+        .arg("-C")
+        .arg(dir)
+        .args(["fetch", "--quiet"])
         .stdout(std::process::Stdio::null())
         .stderr(std::process::Stdio::null())
         .status()
@@ -154,14 +202,16 @@ fn parse_args() -> Result<Args, Box<dyn std::error::Error>> {
     let mut args = Args {
         fresh: false,
         offline: false,
+        no_color: false,
     };
 
     for arg in std::env::args().skip(1) {
         match arg.as_str() {
             "--fresh" | "--refresh" => args.fresh = true,
             "--offline" => args.offline = true,
+            "--no-color" => args.no_color = true,
             "-h" | "--help" => {
-                println!("Usage: jiancha [--fresh|--refresh] [--offline]");
+                println!("Usage: jiancha [--fresh|--refresh] [--offline] [--no-color]");
                 std::process::exit(0);
             }
             _ => return Err(format!("Unknown argument: {arg}").into()),
@@ -226,6 +276,12 @@ fn cached_fetch_status(entry: &CacheEntry, repo: &RepoRow, now: u64) -> Option<F
 }
 
 fn terminal_width() -> Option<u16> {
+    tty_width()
+        .or_else(columns_width)
+        .or_else(|| Table::new().width())
+}
+
+fn tty_width() -> Option<u16> {
     Command::new("sh")
         .args(["-c", "stty size < /dev/tty"])
         .output()
@@ -238,13 +294,13 @@ fn terminal_width() -> Option<u16> {
                 .and_then(|w| w.parse::<u16>().ok())
         })
         .filter(|&w| w > 0)
-        .or_else(|| {
-            std::env::var("COLUMNS")
-                .ok()
-                .and_then(|s| s.parse::<u16>().ok())
-                .filter(|&w| w > 0)
-        })
-        .or_else(|| Table::new().width())
+}
+
+fn columns_width() -> Option<u16> {
+    std::env::var("COLUMNS")
+        .ok()
+        .and_then(|s| s.parse::<u16>().ok())
+        .filter(|&w| w > 0)
 }
 
 const DEFAULT_TABLE_WIDTH: u16 = 101;
@@ -265,9 +321,14 @@ fn truncate_string(s: &str, max_len: usize) -> String {
     }
 }
 
-fn render_all(repos: &[RepoRow], sections: &IndexMap<String, Vec<usize>>) -> String {
+fn render_all(
+    repos: &[RepoRow],
+    sections: &IndexMap<String, Vec<usize>>,
+    terminal_width: Option<u16>,
+    color: bool,
+) -> String {
     let mut output = String::new();
-    let viewport_width = terminal_width().map(|w| w.saturating_sub(2));
+    let viewport_width = terminal_width.map(|w| w.saturating_sub(2));
     let full_size = viewport_width.map_or(true, |w| w >= DEFAULT_TABLE_WIDTH);
     let compact = viewport_width.is_some_and(|w| w < 80);
     let narrow = viewport_width.is_some_and(|w| w < 60);
@@ -283,15 +344,20 @@ fn render_all(repos: &[RepoRow], sections: &IndexMap<String, Vec<usize>>) -> Str
         let repo_indices = &sections[section_name];
 
         output.push('\n');
-        output.push_str(&format!("\x1b[1;38;2;255;140;0m{}\x1b[0m\n", rule));
-        output.push_str(&format!(
-            "\x1b[1;38;2;255;140;0m    {}\x1b[0m\n",
-            section_name.to_uppercase()
-        ));
-        output.push_str(&format!("\x1b[1;38;2;255;140;0m{}\x1b[0m\n", rule));
+        let title = format!("    {}", section_name.to_uppercase());
+        for line in [&rule, &title, &rule] {
+            if color {
+                output.push_str(&format!("\x1b[1;38;2;255;140;0m{}\x1b[0m\n", line));
+            } else {
+                output.push_str(&format!("{}\n", line));
+            }
+        }
 
         let mut table = Table::new();
         table.load_preset(ASCII_FULL);
+        if !color {
+            table.force_no_tty();
+        }
         if full_size {
             table.set_content_arrangement(ContentArrangement::Disabled);
         } else if let Some(width) = viewport_width {
@@ -482,9 +548,114 @@ fn render_all(repos: &[RepoRow], sections: &IndexMap<String, Vec<usize>>) -> Str
     output
 }
 
+fn has_git_marker(dir: &Path) -> bool {
+    std::env::var_os("GIT_DIR").is_some()
+        || dir.ancestors().any(|p| {
+            p.join(".git").exists() || (p.join("HEAD").is_file() && p.join("objects").is_dir())
+        })
+}
+
+fn empty_row(repo_name: &str, dir_str: &str) -> RepoRow {
+    RepoRow {
+        repo_key: repo_name.to_string(),
+        directory: dir_str.to_string(),
+        head: None,
+        branch: None,
+        last_commit: None,
+        clean: None,
+        has_unpushed: None,
+        upstream: None,
+        local_error: None,
+        fetch_status: FetchStatus::Pending,
+    }
+}
+
+fn inspect_repo(repo_name: &str, dir_str: &str, commits: &HashMap<String, CommitEntry>) -> RepoRow {
+    let mut row = empty_row(repo_name, dir_str);
+
+    let resolved = match Path::new(dir_str).canonicalize() {
+        Ok(p) => p,
+        Err(_) => {
+            row.local_error = Some("Not a valid directory".into());
+            return row;
+        }
+    };
+    row.directory = resolved.to_string_lossy().into_owned();
+
+    if !has_git_marker(&resolved) {
+        row.local_error = Some("Not a Git repository".into());
+        return row;
+    }
+
+    match get_local_info(&resolved, commits.get(&row.directory)) {
+        Ok(info) => {
+            row.head = Some(info.head);
+            row.branch = Some(info.branch);
+            row.last_commit = Some(info.last_commit);
+            row.clean = Some(info.clean);
+            row.has_unpushed = info.has_unpushed;
+            row.upstream = info.upstream;
+        }
+        Err(error) => row.local_error = Some(error.into()),
+    }
+    row
+}
+
+fn inspection_workers(jobs: usize) -> usize {
+    let cpus = thread::available_parallelism()
+        .map(|n| n.get())
+        .unwrap_or(4);
+    (cpus * 3 / 4).max(4).min(jobs.max(1))
+}
+
+fn inspect_all(
+    jobs: &[(&String, &String)],
+    commits: &HashMap<String, CommitEntry>,
+) -> Vec<RepoRow> {
+    let next = AtomicUsize::new(0);
+    let results: Vec<(usize, RepoRow)> = thread::scope(|s| {
+        let handles: Vec<_> = (0..inspection_workers(jobs.len()))
+            .map(|_| {
+                s.spawn(|| {
+                    let mut done = Vec::new();
+                    loop {
+                        let idx = next.fetch_add(1, Ordering::Relaxed);
+                        let Some((repo_name, dir_str)) = jobs.get(idx) else {
+                            break;
+                        };
+                        done.push((idx, inspect_repo(repo_name, dir_str, commits)));
+                    }
+                    done
+                })
+            })
+            .collect();
+        handles
+            .into_iter()
+            .flat_map(|h| h.join().unwrap_or_default())
+            .collect()
+    });
+
+    let mut slots: Vec<Option<RepoRow>> = jobs.iter().map(|_| None).collect();
+    for (idx, row) in results {
+        slots[idx] = Some(row);
+    }
+    slots
+        .into_iter()
+        .zip(jobs)
+        .map(|(slot, (repo_name, dir_str))| {
+            slot.unwrap_or_else(|| {
+                let mut row = empty_row(repo_name, dir_str);
+                row.local_error = Some("Failed to get git info".into());
+                row
+            })
+        })
+        .collect()
+}
+
 fn run() -> Result<(), Box<dyn std::error::Error>> {
     let args = parse_args()?;
     let config = load_config()?;
+    let width_probe = (!args.no_color).then(|| thread::spawn(terminal_width));
     let now = now_secs();
     let cache_path = cache_path()?;
     let mut cache = load_cache(&cache_path);
@@ -493,80 +664,29 @@ fn run() -> Result<(), Box<dyn std::error::Error>> {
         .map(|last_run_at| now.saturating_sub(last_run_at) > SESSION_GAP_REFRESH_SECS)
         .unwrap_or(true);
 
-    let mut repos: Vec<RepoRow> = Vec::new();
+    let mut jobs: Vec<(&String, &String)> = Vec::new();
     let mut sections: IndexMap<String, Vec<usize>> = IndexMap::new();
 
     for (section_name, section) in &config.sections {
         for (repo_name, dir_str) in section {
-            let idx = repos.len();
-            sections.entry(section_name.clone()).or_default().push(idx);
-
-            let dir_path = PathBuf::from(dir_str);
-            let resolved = match dir_path.canonicalize() {
-                Ok(p) => p,
-                Err(_) => {
-                    repos.push(RepoRow {
-                        repo_key: repo_name.clone(),
-                        directory: dir_str.clone(),
-                        branch: None,
-                        last_commit: None,
-                        clean: None,
-                        has_unpushed: None,
-                        upstream: None,
-                        local_error: Some("Not a valid directory".into()),
-                        fetch_status: FetchStatus::Pending,
-                    });
-                    continue;
-                }
-            };
-
-            if !is_git_repo(&resolved) {
-                repos.push(RepoRow {
-                    repo_key: repo_name.clone(),
-                    directory: resolved.to_string_lossy().into_owned(),
-                    branch: None,
-                    last_commit: None,
-                    clean: None,
-                    has_unpushed: None,
-                    upstream: None,
-                    local_error: Some("Not a Git repository".into()),
-                    fetch_status: FetchStatus::Pending,
-                });
-                continue;
-            }
+            sections
+                .entry(section_name.clone())
+                .or_default()
+                .push(jobs.len());
+            jobs.push((repo_name, dir_str));
+        }
+    }
 
-            let dir_s = resolved.to_string_lossy().into_owned();
-            let (branch, last_commit, clean, has_unpushed, upstream, local_error) =
-                match get_local_info(&dir_s) {
-                    Some(info) => (
-                        Some(info.branch),
-                        Some(info.last_commit),
-                        Some(info.clean),
-                        info.has_unpushed,
-                        info.upstream,
-                        None,
-                    ),
-                    None => (
-                        None,
-                        None,
-                        None,
-                        None,
-                        None,
-                        Some("Failed to get git info".into()),
-                    ),
-                };
-
-            repos.push(RepoRow {
-                repo_key: repo_name.clone(),
-                directory: dir_s,
-                branch,
-                last_commit,
-                clean,
-                has_unpushed,
-                upstream,
-                local_error,
-                fetch_status: FetchStatus::Pending,
-            });
+    let mut repos = inspect_all(&jobs, &cache.commits);
+    for repo in &repos {
+        if let (Some(head), Some(last_commit)) = (&repo.head, &repo.last_commit) {
+            cache.commits.insert(
+                repo.directory.clone(),
+                CommitEntry {
+                    head: head.clone(),
+                    last_commit: last_commit.clone(),
+                },
+            );
         }
     }
 
@@ -602,7 +722,7 @@ fn run() -> Result<(), Box<dyn std::error::Error>> {
         .into_iter()
         .map(|idx| {
             let dir = repos[idx].directory.clone();
-            let handle = thread::spawn(move || run_git_fetch(&dir));
+            let handle = thread::spawn(move || run_git_fetch(Path::new(&dir)));
             (idx, handle)
         })
         .collect();
@@ -625,7 +745,11 @@ fn run() -> Result<(), Box<dyn std::error::Error>> {
     cache.last_run_at = Some(now);
     save_cache(&cache_path, &cache)?;
 
-    print!("{}", render_all(&repos, &sections));
+    let width = match width_probe {
+        Some(probe) => probe.join().ok().flatten(),
+        None => columns_width(),
+    };
+    print!("{}", render_all(&repos, &sections, width, !args.no_color));
     Ok(())
 }
 